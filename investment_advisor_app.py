@@ -1,18 +1,53 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from pathlib import Path
 import os
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
-from langchain_openai import ChatOpenAI
+import re
+import hashlib
+import json
+import threading
+import time
+import httpx
+import queue
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import warnings
 warnings.filterwarnings('ignore')
 
 load_dotenv()
 
+# Verbose CrewAI tracing is for local debugging only (CREW_DEBUG=1)
+DEBUG = os.getenv("CREW_DEBUG") == "1"
+
+# Model per agent: smaller models for the structured legs, a stronger one for
+# the final synthesis
+AGENT_MODELS = {
+    "research": "gpt-4o-mini",
+    "analysis": "gpt-4o-mini",
+    "risk": "gpt-3.5-turbo",
+    "advisor": "gpt-4o",
+}
+
+# Lower temperatures on the fact-finding legs make repeat prompts, and so
+# LLM cache hits, more likely
+AGENT_TEMPERATURES = {
+    "research": 0.2,
+    "analysis": 0.7,
+    "risk": 0.2,
+    "advisor": 0.7,
+}
+LLM_CACHE_DIR = ".llm_cache"
+
+# One markdown file per report; session state keeps only the file key
+REPORT_DIR = Path(".reports")
+REPORT_CACHE_TTL = 86400  # seconds
+
+# Phrases the agents use when they could not find enough data
+_FAIL_RE = re.compile(r"absence of|unable to provide", re.IGNORECASE)
+
 st.set_page_config(
     page_title="Investment Advisor",
     page_icon="💼",
@@ -20,225 +55,315 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Professional green-blue color scheme
-st.markdown("""
-    <style>
-    :root {
-        --primary-green: #059669;
-        --primary-blue: #0284c7;
-        --accent-teal: #14b8a6;
-        --dark-gray: #1f2937;
-        --light-gray: #f3f4f6;
-        --border-color: #e5e7eb;
-    }
-    
-    .main-title {
-        font-size: 2.8rem;
-        font-weight: 700;
-        background: linear-gradient(135deg, #059669 0%, #0284c7 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        margin-bottom: 0.5rem;
-        padding-top: 1rem;
-    }
-    
-    .subtitle {
-        text-align: center;
-        color: #6b7280;
-        font-size: 1.2rem;
-        margin-bottom: 2.5rem;
-        font-weight: 400;
-    }
-    
-    .welcome-card {
-        background: linear-gradient(135deg, #059669 0%, #0284c7 100%);
-        color: white;
-        padding: 2rem;
-        border-radius: 16px;
-        margin-bottom: 2rem;
-        box-shadow: 0 10px 25px rgba(5, 150, 105, 0.2);
-    }
-    
-    .welcome-card h3 {
-        margin-top: 0;
-        font-size: 1.5rem;
-        font-weight: 600;
-    }
-    
-    .welcome-card p {
-        font-size: 1rem;
-        line-height: 1.6;
-        opacity: 0.95;
-    }
-    
-    .metric-box {
-        background: linear-gradient(to bottom right, #f0fdf4, #e0f2fe);
-        padding: 1.5rem;
-        border-radius: 10px;
-        border-left: 4px solid var(--primary-green);
-        margin-bottom: 1rem;
-    }
-    
-    .metric-box h4 {
-        color: var(--primary-green);
-        margin: 0 0 0.5rem 0;
-        font-size: 0.9rem;
-        font-weight: 600;
-        text-transform: uppercase;
-    }
-    
-    .metric-box .value {
-        font-size: 1.8rem;
-        font-weight: 700;
-        color: var(--dark-gray);
-    }
-    
-    .warning-card {
-        background: #fef3c7;
-        border-left: 4px solid #f59e0b;
-        padding: 1.2rem;
-        border-radius: 8px;
-        margin: 1.5rem 0;
-    }
-    
-    .warning-card p {
-        margin: 0;
-        color: #92400e;
-        font-size: 0.95rem;
-    }
-    
-    .stButton>button {
-        background: linear-gradient(135deg, #059669 0%, #0284c7 100%);
-        color: white;
-        border: none;
-        border-radius: 10px;
-        padding: 0.85rem 2.5rem;
-        font-weight: 600;
-        font-size: 1.05rem;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(5, 150, 105, 0.3);
-    }
-    
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(5, 150, 105, 0.4);
-    }
-    
-    .section-header {
-        font-size: 1.6rem;
-        font-weight: 600;
-        color: var(--dark-gray);
-        margin: 2rem 0 1rem 0;
-        padding-bottom: 0.5rem;
-        border-bottom: 3px solid var(--primary-green);
-    }
-    
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    .stDeployButton {display: none;}
-    
-    [data-testid="stSidebar"] {
-        background: linear-gradient(to bottom, #f0fdf4, #e0f2fe);
-    }
-    
-    .stTextInput>div>div>input {
-        border-radius: 8px;
-        border: 2px solid var(--border-color);
-    }
-    
-    .stTextInput>div>div>input:focus {
-        border-color: var(--primary-green);
-        box-shadow: 0 0 0 3px rgba(5, 150, 105, 0.1);
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-def initialize_system(api_key, search_key):
-    """Initialize the investment analysis system"""
-    os.environ["OPENAI_API_KEY"] = api_key
-    os.environ["SERPER_API_KEY"] = search_key
-    
-    search_tool = SerperDevTool()
-    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7)
-    
-    research_agent = Agent(
-        role="Investment Research Specialist",
-        goal="Find and analyze specific investment opportunities with real data.",
-        backstory="Experienced analyst providing concrete recommendations with specific names and current data.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[search_tool],
-        llm=llm
-    )
-    
-    analysis_agent = Agent(
-        role="Financial Analyst",
-        goal="Create detailed projections with specific numbers.",
-        backstory="Quantitative expert providing concrete figures and calculations.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[search_tool],
-        llm=llm
-    )
-    
-    risk_agent = Agent(
-        role="Risk Specialist",
-        goal="Provide specific risk ratings and mitigation strategies.",
-        backstory="Risk manager with clear assessments and actionable advice.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[search_tool],
-        llm=llm
-    )
-    
-    advisor_agent = Agent(
-        role="Investment Advisor",
-        goal="Create clear, actionable recommendations.",
-        backstory="Senior advisor providing specific advice with percentages and action steps.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[search_tool],
-        llm=llm
+# Stylesheet kept in its own file and inlined on every run; static serving
+# needs .streamlit/config.toml and only serves .css correctly on newer releases
+APP_CSS_PATH = Path(__file__).with_name("static") / "app.css"
+
+@st.cache_resource(show_spinner=False)
+def load_css():
+    """App stylesheet, read from disk once per process"""
+    return APP_CSS_PATH.read_text(encoding='utf-8')
+
+def inject_css():
+    """Inline the app stylesheet"""
+    # Every rerun must resend it; Streamlit drops elements a run doesn't emit
+    st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+
+inject_css()
+
+# Static blocks are sent with a single st.markdown call each
+INSIGHT_METRICS_HTML = (
+    '<div class="metric-box"><h4>Diversity</h4><div class="value">4-6</div></div>'
+    '<div class="metric-box"><h4>Target</h4><div class="value">7-12%</div></div>'
+    '<div class="metric-box"><h4>Mix</h4><div class="value">60/30/10</div></div>'
+)
+FOOTER_HTML = (
+    '---\n\n'
+    '<div style="text-align:center;color:#6b7280;padding:2rem;"><p>Intelligent Analysis • Secure • Informational Only</p></div>'
+)
+
+# (model key, role, goal, backstory) for the research, analysis, risk and
+# advisor agents, in the order create_tasks expects them
+_AGENT_SPECS = (
+    ("research", "Investment Research Specialist",
+     "Find and analyze specific investment opportunities with real data.",
+     "Experienced analyst providing concrete recommendations with specific names and current data."),
+    ("analysis", "Financial Analyst",
+     "Create detailed projections with specific numbers.",
+     "Quantitative expert providing concrete figures and calculations."),
+    ("risk", "Risk Specialist",
+     "Provide specific risk ratings and mitigation strategies.",
+     "Risk manager with clear assessments and actionable advice."),
+    ("advisor", "Investment Advisor",
+     "Create clear, actionable recommendations.",
+     "Senior advisor providing specific advice with percentages and action steps."),
+)
+
+SERPER_BASE_URL = "https://google.serper.dev"
+BATCH_QUERY_SEPARATOR = " | "
+SEARCH_CACHE_SIZE = 256
+
+@st.cache_resource(show_spinner=False)
+def get_search_cache():
+    """Process-wide Serper result memo and the lock guarding it"""
+    return {}, threading.Lock()
+
+# Batch responses for the tool call running on this thread, read back by
+# _make_api_request so each query is formatted without another request
+_batch_prefetch = threading.local()
+
+def create_search_tool(api_key, refresh=False):
+    """Build the Serper search tool shared by all agents; refresh ignores memoized results"""
+    from crewai_tools import SerperDevTool
+    
+    class BatchSerperDevTool(SerperDevTool):
+        """SerperDevTool that sends several queries in a single batch request"""
+        description: str = (
+            "Search the internet with a search_query. To look up several related "
+            f"topics at once, separate the queries with '{BATCH_QUERY_SEPARATOR}'."
+        )
+        api_key: str = ""
+        refresh: bool = False
+    
+        def _remember(self, key, value):
+            cache, lock = get_search_cache()
+            with lock:
+                if len(cache) >= SEARCH_CACHE_SIZE:
+                    cache.pop(next(iter(cache)))
+                cache[key] = value
+        
+        def _memo_key(self, search_query, search_type):
+            # Everything that shapes the response, plus the day it was fetched
+            return (search_query.strip().lower(), search_type.lower(), self.n_results,
+                    self.country, self.location, self.locale, date.today().isoformat())
+        
+        def _payload(self, search_query):
+            payload = {"q": search_query, "num": self.n_results}
+            for field, value in (("gl", self.country), ("location", self.location), ("hl", self.locale)):
+                if value:
+                    payload[field] = value
+            return payload
+        
+        def _post(self, search_type, payload):
+            # The pooled client keeps the TLS connection warm between searches
+            response = get_http_client().post(
+                f"{SERPER_BASE_URL}/{search_type.lower()}",
+                headers={"X-API-KEY": self.api_key, "Content-Type": "application/json"},
+                json=payload,
+                timeout=30
+            )
+            response.raise_for_status()
+            return response.json()
+        
+        def _make_api_request(self, search_query, search_type):
+            """Serper request authenticated with this tool's key instead of SERPER_API_KEY"""
+            # Results are memoized for the day, so repeated searches by any
+            # agent skip the API
+            key = self._memo_key(search_query, search_type)
+            prefetched = getattr(_batch_prefetch, "results", {})
+            if key in prefetched:
+                return prefetched[key]
+            cache, lock = get_search_cache()
+            with lock:
+                if key in cache and not self.refresh:
+                    return cache[key]
+            result = self._post(search_type, self._payload(search_query))
+            self._remember(key, result)
+            return result
+        
+        def _run(self, **kwargs):
+            search_query = kwargs.get("search_query") or kwargs.get("query") or ""
+            queries = [q.strip() for q in search_query.split(BATCH_QUERY_SEPARATOR) if q.strip()]
+            
+            if len(queries) < 2:
+                return super()._run(**kwargs)
+            
+            search_type = kwargs.get("search_type", self.search_type)
+            keys = {q: self._memo_key(q, search_type) for q in queries}
+            cache, lock = get_search_cache()
+            with lock:
+                found = {} if self.refresh else {keys[q]: cache[keys[q]] for q in queries if keys[q] in cache}
+            missing = [q for q in queries if keys[q] not in found]
+            if missing:
+                # Serper accepts a list of query objects and answers them in one
+                # round-trip
+                responses = self._post(search_type, [self._payload(q) for q in missing])
+                for q, r in zip(missing, responses):
+                    found[keys[q]] = r
+                    self._remember(keys[q], r)
+            
+            # Each query goes through SerperDevTool's own formatting, so it gets
+            # the same structure (knowledge graph, answer box, related
+            # questions) as a single search
+            _batch_prefetch.results = found
+            try:
+                results = {}
+                for q in queries:
+                    results[q] = super()._run(**{**kwargs, "search_query": q})
+                return results
+            finally:
+                _batch_prefetch.results = {}
+    
+    return BatchSerperDevTool(api_key=api_key, refresh=refresh)
+
+@st.cache_resource(show_spinner=False)
+def get_http_client():
+    """Process-wide pooled HTTP client so LLM and search calls reuse warm TLS connections"""
+    return httpx.Client(limits=httpx.Limits(max_keepalive_connections=20))
+
+@st.cache_resource(show_spinner=False)
+def share_http_client_with_llms():
+    """Send litellm's synchronous LLM calls through the pooled HTTP client"""
+    # crewai turns every model into a litellm call, which ignores clients set
+    # on the model object; litellm.client_session is the hook it reads
+    import litellm
+    litellm.client_session = get_http_client()
+
+@st.cache_resource(show_spinner=False)
+def enable_llm_cache():
+    """Serve repeated identical completions from litellm's on-disk cache"""
+    # crewai sends every LLM call through litellm, so its cache is the one
+    # consulted; a LangChain cache would never be hit
+    import litellm
+    from litellm.caching import Cache
+    # Same lifetime as saved reports, so prompts asking for current data
+    # don't replay day-old answers indefinitely
+    litellm.cache = Cache(type="disk", disk_cache_dir=LLM_CACHE_DIR, ttl=REPORT_CACHE_TTL)
+
+# Rotated keys leave their agents behind in the cache; bounding it evicts
+# stale key pairs without clearing other sessions' agents
+@st.cache_resource(show_spinner=False, max_entries=8)
+def initialize_system(api_key, search_key, models=None, refresh=False):
+    """Initialize the investment analysis system (cached per key pair); refresh
+    agents skip cached completions and searches but still store fresh ones"""
+    # Imported here so page loads that never generate a report skip the
+    # crewai/langchain import cost
+    from crewai import Agent, LLM
+    
+    models = models or AGENT_MODELS
+    search_tool = create_search_tool(search_key, refresh=refresh)
+    enable_llm_cache()
+    share_http_client_with_llms()
+    tiers = {(models[key], AGENT_TEMPERATURES[key]) for key in models}
+    # crewai.LLM directly: Agent converts any LangChain model into one and keeps
+    # only the model name and sampling settings
+    # Extra LLM kwargs go to litellm per call; "no-cache" skips the lookup only
+    cache_options = {'cache': {'no-cache': True}} if refresh else {}
+    llms = {(model, temperature): LLM(model=model, temperature=temperature, api_key=api_key,
+                                      **cache_options)
+            for model, temperature in tiers}
+    
+    return tuple(
+        Agent(
+            role=role,
+            goal=goal,
+            backstory=backstory,
+            verbose=DEBUG,
+            allow_delegation=False,
+            tools=[search_tool],
+            llm=llms[models[key], AGENT_TEMPERATURES[key]]
+        )
+        for key, role, goal, backstory in _AGENT_SPECS
     )
-    
-    return research_agent, analysis_agent, risk_agent, advisor_agent, llm
 
-def create_tasks(agents, data):
-    """Create clear analysis tasks"""
-    research_agent, analysis_agent, risk_agent, advisor_agent = agents
+def get_system(api_key, search_key, refresh=False):
+    """Return this session's agents, building them on first use or key change"""
+    # Compare key fingerprints so raw secrets are not kept in session state
+    fingerprint = hashlib.sha256(f"{api_key}:{search_key}:{refresh}".encode()).hexdigest()[:16]
+    if st.session_state.get("agents_keys") != fingerprint:
+        st.session_state["agents"] = initialize_system(api_key, search_key, refresh=refresh)
+        st.session_state["agents_keys"] = fingerprint
+    return st.session_state["agents"]
+
+def create_tasks(agents, data, quick=False):
+    """Create clear analysis tasks; quick mode fuses the three analysis legs"""
+    from crewai import Task
+    from pydantic import BaseModel
     
-    task1 = Task(
-        description=(
-            f"Research 3-5 specific investments for {data['amount']} {data['currency']}. "
-            f"Focus: {data['preferences']}. Geography: {data['geography']}. "
-            f"Risk: {data['risk_tolerance']}. "
-            "Provide: names, tickers, prices, 6-month performance."
-        ),
-        expected_output="List with investment names, tickers, prices, and performance data.",
-        agent=research_agent
-    )
+    research_agent, analysis_agent, risk_agent, advisor_agent = agents
     
-    task2 = Task(
-        description=(
-            f"Create {data['time_horizon']}-year projections for {data['amount']} {data['currency']}. "
-            "Calculate conservative, expected, and optimistic scenarios with specific numbers."
-        ),
-        expected_output="Year-by-year projections with three scenarios and final values.",
-        agent=analysis_agent
+    # Every description starts with the same portfolio block so the provider's
+    # prompt-prefix cache can reuse it across the four tasks
+    portfolio_context = (
+        f"Portfolio: {data['amount']} {data['currency']}. "
+        f"Focus: {data['preferences']}. Geography: {data['geography']}. "
+        f"Risk: {data['risk_tolerance']}. Horizon: {data['time_horizon']} years.\n\n"
     )
     
-    task3 = Task(
-        description=(
-            f"Assess risks for {data['risk_tolerance']} risk tolerance. "
-            "Provide risk ratings and specific mitigation strategies."
-        ),
-        expected_output="Risk ratings and concrete mitigation steps for each investment.",
-        agent=risk_agent
-    )
+    if quick:
+        class MarketAnalysis(BaseModel):
+            opportunities: list[str]
+            projections: list[str]
+            risks: list[str]
+        
+        # One call covers research, projections and risk, so the advisor
+        # synthesis is the only other LLM round-trip
+        analysis_task = Task(
+            description=(
+                portfolio_context +
+                "In a single answer: "
+                "1) Research 3-5 specific investments (names, tickers, prices, 6-month performance), "
+                "2) Create year-by-year conservative, expected, and optimistic projections for the full amount, "
+                "3) Give a risk rating and a concrete mitigation step for each investment."
+            ),
+            expected_output="JSON with opportunities, projections, and risks lists.",
+            agent=research_agent,
+            output_json=MarketAnalysis
+        )
+        upstream = [analysis_task]
+    else:
+        task1 = Task(
+            description=(
+                portfolio_context +
+                "Research 3-5 specific investments matching this portfolio. "
+                "Provide: names, tickers, prices, 6-month performance."
+            ),
+            expected_output="List with investment names, tickers, prices, and performance data.",
+            agent=research_agent
+        )
+        
+        class Scenario(BaseModel):
+            yearly_values: list[float]
+            final_value: float
+        
+        class Projections(BaseModel):
+            conservative: Scenario
+            expected: Scenario
+            optimistic: Scenario
+        
+        # All three scenarios come back in one structured response
+        task2 = Task(
+            description=(
+                portfolio_context +
+                "Create year-by-year projections over the horizon for the full amount. "
+                "Calculate conservative, expected, and optimistic scenarios with specific numbers "
+                "and return all three together in a single JSON object."
+            ),
+            expected_output="JSON with conservative, expected, and optimistic scenarios, "
+                            "each with yearly values and a final value.",
+            agent=analysis_agent,
+            output_json=Projections,
+            context=[task1],
+            async_execution=True
+        )
+        
+        task3 = Task(
+            description=(
+                portfolio_context +
+                "Assess risks for this risk tolerance. "
+                "Provide risk ratings and specific mitigation strategies."
+            ),
+            expected_output="Risk ratings and concrete mitigation steps for each investment.",
+            agent=risk_agent,
+            context=[task1],
+            async_execution=True
+        )
+        
+        upstream = [task1, task2, task3]
     
     task4 = Task(
         description=(
+            portfolio_context +
             "Create final recommendations with: "
             "1) Ranked investments, "
             "2) Allocation percentages (totaling 100%), "
@@ -246,102 +371,382 @@ def create_tasks(agents, data):
             "4) Action steps."
         ),
         expected_output="Numbered recommendations with allocations, returns, and action steps.",
-        agent=advisor_agent
+        agent=advisor_agent,
+        context=upstream
     )
     
-    return [task1, task2, task3, task4]
+    return upstream + [task4]
 
-def run_analysis(data, api_key, search_key):
-    """Execute analysis with proper error handling"""
+def report_cache_key(data):
+    """Stable hash of the analysis inputs"""
+    return hashlib.blake2b(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+def report_path(key):
+    """Location of the saved report for a cache key"""
+    return REPORT_DIR / f"{key}.md"
+
+def is_report_fresh(key):
+    """Whether a saved report younger than REPORT_CACHE_TTL exists"""
     try:
-        agents = initialize_system(api_key, search_key)
-        manager_llm = agents[-1]
-        agents = agents[:-1]
+        return time.time() - report_path(key).stat().st_mtime < REPORT_CACHE_TTL
+    except FileNotFoundError:
+        return False
+
+def read_report(key):
+    """Text of a saved report"""
+    return report_path(key).read_text(encoding='utf-8')
+
+def save_report(key, report):
+    """Write a report to disk; the rename keeps concurrent readers off partial files"""
+    REPORT_DIR.mkdir(exist_ok=True)
+    tmp = report_path(key).with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text(report, encoding='utf-8')
+    os.replace(tmp, report_path(key))
+
+def describe_step(step):
+    """Short progress label for a CrewAI agent step"""
+    tool = getattr(step, 'tool', None)
+    return f"🔎 Searching with {tool}..." if tool else "🧠 Reasoning..."
+
+# Risk levels run side by side when "Compare scenarios" is on; each is a full
+# crew run, so they share the OpenAI rate limit
+COMPARE_RISK_LEVELS = ("Low", "Medium", "High")
+MAX_CONCURRENT_CREWS = 3
+
+def report_text(result):
+    """Report text from a crew output, or None after warning if it is unusable"""
+    if hasattr(result, 'raw'):
+        result_str = str(result.raw)
+    elif hasattr(result, 'output'):
+        result_str = str(result.output)
+    elif hasattr(result, 'result'):
+        result_str = str(result.result)
+    else:
+        result_str = str(result)
+    
+    if len(result_str.strip()) < 200:
+        st.error("❌ Insufficient data. Try again with different parameters.")
+        return None
+    
+    if _FAIL_RE.search(result_str):
+        st.warning("⚠️ Could not find sufficient market data.")
+        st.info("💡 Try: simpler investment types, broader regions, or wait a moment.")
+        return None
+    
+    return result_str
+
+class AnalysisCancelled(Exception):
+    """Raised inside the crew when the user cancels a running analysis"""
+
+@st.cache_resource(show_spinner=False)
+def get_crew_executor():
+    """Worker pool shared by all sessions; caps concurrent crew runs"""
+    return ThreadPoolExecutor(max_workers=4)
+
+def request_cancel():
+    """Ask the running analysis to stop at its next agent step"""
+    event = st.session_state.get('cancel_event')
+    if event is not None:
+        event.set()
+    # The click reruns the script and ends the poll loop, so the notice is
+    # shown by the next run instead
+    st.session_state.analysis_cancelled = True
+
+def show_progress(progress, container=None):
+    """Drain queued (label, task output) events; return how many tasks finished"""
+    finished = 0
+    while not progress.empty():
+        label, output = progress.get_nowait()
+        if output is not None:
+            finished += 1
+        if container is None:
+            continue
+        container.update(label=label)
+        if output is not None:
+            container.markdown(f"**{output.agent}**\n\n{output.raw}")
+    return finished
+
+async def kickoff_each(crew, inputs):
+    """Run a copy of the crew per input dict, at most MAX_CONCURRENT_CREWS at once"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CREWS)
+    async def kickoff_one(item):
+        async with semaphore:
+            return await crew.copy().kickoff_async(inputs=item)
+    return await asyncio.gather(*(kickoff_one(item) for item in inputs))
+
+def kickoff_in_background(crew, progress, container=None, inputs=None):
+    """Run the crew on the shared worker pool while reporting progress; with
+    inputs, run one copy per input dict and return the outputs in order"""
+    # The worker only feeds the progress queue; all Streamlit calls stay on
+    # the script thread
+    def kickoff():
+        if inputs is None:
+            return crew.kickoff()
+        return asyncio.run(kickoff_each(crew, inputs))
+    
+    future = get_crew_executor().submit(kickoff)
+    bar = container.progress(0.0) if container is not None else None
+    total = len(crew.tasks) * (len(inputs) if inputs else 1)
+    done = 0
+    while True:
+        finished = future.done()
+        done += show_progress(progress, container)
+        if bar is not None:
+            bar.progress(min(done / total, 1.0))
+        if finished:
+            break
+        time.sleep(0.25)
+    return future.result()
+
+def run_analysis(data, api_key, search_key, container=None, force_refresh=False, quick=False,
+                 compare=False):
+    """Execute analysis with proper error handling; returns the saved report's key,
+    or {risk level: key} when comparing"""
+    # Deferred like the crewai imports; openai pulls in pydantic and httpx models
+    from openai import AuthenticationError, RateLimitError
+    from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+    
+    kickoff_with_retry = retry(
+        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=60),
+        retry=retry_if_exception_type(RateLimitError), reraise=True
+    )(kickoff_in_background)
+    
+    try:
+        levels = COMPARE_RISK_LEVELS if compare else (data['risk_tolerance'],)
+        cache_keys = {
+            level: report_cache_key({**data, 'risk_tolerance': level, 'quick': quick})
+            for level in levels
+        }
+        if not force_refresh and all(map(is_report_fresh, cache_keys.values())):
+            st.session_state.report_from_cache = True
+            return cache_keys if compare else cache_keys[levels[0]]
+        st.session_state.report_from_cache = False
         
-        tasks = create_tasks(agents, data)
+        progress = queue.Queue()
+        cancel_event = threading.Event()
+        st.session_state.cancel_event = cancel_event
         
-        crew = Crew(
-            agents=list(agents),
-            tasks=tasks,
-            manager_llm=manager_llm,
-            process=Process.hierarchical,
-            verbose=True
-        )
+        def on_step(step):
+            # Raising from the step callback aborts the crew on its worker thread
+            if cancel_event.is_set():
+                raise AnalysisCancelled()
+            progress.put((describe_step(step), None))
         
-        result = crew.kickoff()
+        # The cached agents are shared by every run with these keys, and
+        # Crew.kickoff only sets agent.step_callback when it is unset, so each
+        # run works on its own copies carrying this run's callback
+        agents = [agent.copy() for agent in get_system(api_key, search_key, refresh=force_refresh)]
+        for agent in agents:
+            agent.step_callback = on_step
         
-        if result is None:
-            return None
+        from crewai import Crew, Process
         
-        # Convert to string
-        if hasattr(result, 'raw'):
-            result_str = str(result.raw)
-        elif hasattr(result, 'output'):
-            result_str = str(result.output)
-        elif hasattr(result, 'result'):
-            result_str = str(result.result)
+        # Research runs first, projections and risk run concurrently on its
+        # output, and the advisor task waits on all three through its context
+        if compare:
+            # CrewAI fills the placeholder from each scenario's inputs
+            tasks = create_tasks(agents, {**data, 'risk_tolerance': '{risk_tolerance}'}, quick=quick)
+            inputs = [{'risk_tolerance': level} for level in levels]
         else:
-            result_str = str(result)
+            tasks = create_tasks(agents, data, quick=quick)
+            inputs = None
         
-        # Validate result
-        if len(result_str.strip()) < 200:
-            st.error("❌ Insufficient data. Try again with different parameters.")
-            return None
+        crew = Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            cache=True,
+            memory=False,
+            max_rpm=60,
+            step_callback=on_step,
+            task_callback=lambda output: progress.put((f"✅ {output.agent} finished", output)),
+            verbose=DEBUG
+        )
+        
+        if container is not None:
+            container.button("⏹ Cancel", key="cancel_analysis", on_click=request_cancel)
+        result = kickoff_with_retry(crew, progress, container, inputs=inputs)
         
-        if "absence of" in result_str.lower() or "unable to provide" in result_str.lower():
-            st.warning("⚠️ Could not find sufficient market data.")
-            st.info("💡 Try: simpler investment types, broader regions, or wait a moment.")
+        if result is None:
             return None
         
-        return result_str
-    
+        for level, output in zip(levels, result if compare else [result]):
+            report = report_text(output)
+            if report is None:
+                return None
+            save_report(cache_keys[level], report)
+        return cache_keys if compare else cache_keys[levels[0]]
+    
+    except AuthenticationError:
+        st.error("⚠️ Authentication Error: Check your API keys.")
+        return None
+    except RateLimitError:
+        st.error("⚠️ Rate Limit: Wait 1 minute and try again.")
+        return None
     except Exception as e:
-        error_msg = str(e).lower()
-        if "auth" in error_msg or "key" in error_msg:
-            st.error("⚠️ Authentication Error: Check your API keys.")
-        elif "rate" in error_msg:
-            st.error("⚠️ Rate Limit: Wait 1 minute and try again.")
-        else:
-            st.error(f"⚠️ Error: {str(e)}")
+        st.error(f"⚠️ Error: {str(e)}")
         return None
 
+# Growth multiples for every horizon the timeline slider allows
+MAX_HORIZON = 30
+_PROJ_YEARS = np.arange(1, MAX_HORIZON + 1)
+# (name, annual growth factor, line style) for each projection scenario
+_PROJ_LINES = (
+    ('Conservative (5%)', 1.05, {'color': '#059669', 'width': 3}),
+    ('Balanced (8.5%)', 1.085, {'color': '#0284c7', 'width': 3}),
+    ('Growth (13.5%)', 1.135, {'color': '#14b8a6', 'width': 3}),
+)
+_PROJ_RATES = np.array([rate for _, rate, _ in _PROJ_LINES])
+_PROJ = np.power(_PROJ_RATES[:, None], _PROJ_YEARS[None, :])
+
+@st.cache_data(show_spinner=False, max_entries=32)
 def create_projection_chart(years=10):
-    years_list = list(range(1, years + 1))
-    conservative = [1.05**i for i in years_list]
-    balanced = [1.085**i for i in years_list]
-    growth = [1.135**i for i in years_list]
+    years_list = _PROJ_YEARS[:years]
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=years_list, y=conservative, mode='lines+markers',
-                             name='Conservative (5%)', line=dict(color='#059669', width=3)))
-    fig.add_trace(go.Scatter(x=years_list, y=balanced, mode='lines+markers',
-                             name='Balanced (8.5%)', line=dict(color='#0284c7', width=3)))
-    fig.add_trace(go.Scatter(x=years_list, y=growth, mode='lines+markers',
-                             name='Growth (13.5%)', line=dict(color='#14b8a6', width=3)))
+    for (name, _, line), values in zip(_PROJ_LINES, _PROJ[:, :years]):
+        fig.add_trace(go.Scatter(x=years_list, y=values, mode='lines+markers',
+                                 name=name, line=line))
     
     fig.update_layout(title='Investment Growth Scenarios', xaxis_title='Years',
                      yaxis_title='Growth Multiple', hovermode='x unified',
                      template='plotly_white', height=450,
                      legend=dict(orientation="h", y=1.02, x=1, xanchor="right", yanchor="bottom"),
                      plot_bgcolor='rgba(240,253,244,0.3)')
-    return fig
+    return fig.to_dict()
+
+# Annual (expected return, volatility) used for the Monte Carlo bands
+RISK_PROFILES = {
+    "Very Low": (0.04, 0.04),
+    "Low": (0.055, 0.07),
+    "Medium": (0.085, 0.12),
+    "High": (0.12, 0.18),
+    "Very High": (0.15, 0.25),
+}
+SIMULATION_RUNS = 10_000
 
+@st.cache_resource(show_spinner=False)
+def get_path_simulator():
+    """Load the simulation module and compile its kernel once per process"""
+    import simulation
+    simulation.warm_up()
+    return simulation.simulate_paths
+
+def simulate_paths(mu, sigma, years, n_sims=SIMULATION_RUNS, seed=42):
+    """Simulated growth multiples for n_sims paths over the given years"""
+    return get_path_simulator()(mu, sigma, years, n_sims, seed)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def create_simulation_chart(risk_tolerance, years=10):
+    mu, sigma = RISK_PROFILES[risk_tolerance]
+    low, median, high = np.percentile(simulate_paths(mu, sigma, years), [5, 50, 95], axis=0)
+    years_list = _PROJ_YEARS[:years]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=years_list, y=high, mode='lines', line=dict(width=0),
+                             name='95th percentile', showlegend=False))
+    fig.add_trace(go.Scatter(x=years_list, y=low, mode='lines', line=dict(width=0),
+                             fill='tonexty', fillcolor='rgba(5,150,105,0.2)',
+                             name='5th-95th percentile'))
+    fig.add_trace(go.Scatter(x=years_list, y=median, mode='lines+markers',
+                             name='Median', line=dict(color='#059669', width=3)))
+    
+    fig.update_layout(title=f'Simulated Outcomes ({risk_tolerance} Risk)', xaxis_title='Years',
+                     yaxis_title='Growth Multiple', hovermode='x unified',
+                     template='plotly_white', height=450,
+                     legend=dict(orientation="h", y=1.02, x=1, xanchor="right", yanchor="bottom"),
+                     plot_bgcolor='rgba(240,253,244,0.3)')
+    return fig.to_dict()
+
+# Static six-month returns shown in the Trends tab
+_TREND_MONTHS = ('Month 1', 'Month 2', 'Month 3', 'Month 4', 'Month 5', 'Month 6')
+_TREND_SERIES = (
+    ('Equities', '#059669', (2.3, 1.8, 3.1, -0.5, 2.8, 4.2)),
+    ('Real Estate', '#0284c7', (1.5, 1.2, 1.8, 1.3, 1.6, 2.1)),
+    ('International', '#14b8a6', (3.1, 2.5, 4.2, -1.2, 3.5, 5.1)),
+    ('Fixed Income', '#f59e0b', (0.8, 0.7, 0.9, 0.8, 0.8, 1.0)),
+)
+
+@st.cache_data(show_spinner=False)
 def create_trend_chart():
-    months = ['Month 1', 'Month 2', 'Month 3', 'Month 4', 'Month 5', 'Month 6']
-    data = {
-        'Month': months * 4,
-        'Return (%)': [2.3, 1.8, 3.1, -0.5, 2.8, 4.2, 1.5, 1.2, 1.8, 1.3, 1.6, 2.1,
-                       3.1, 2.5, 4.2, -1.2, 3.5, 5.1, 0.8, 0.7, 0.9, 0.8, 0.8, 1.0],
-        'Category': ['Equities']*6 + ['Real Estate']*6 + ['International']*6 + ['Fixed Income']*6
-    }
-    df = pd.DataFrame(data)
-    fig = px.bar(df, x='Month', y='Return (%)', color='Category', barmode='group',
-                 title='Recent Market Performance', template='plotly_white',
-                 color_discrete_map={'Equities': '#059669', 'Real Estate': '#0284c7',
-                                    'International': '#14b8a6', 'Fixed Income': '#f59e0b'},
-                 height=400)
-    fig.update_layout(plot_bgcolor='rgba(240,253,244,0.3)')
-    return fig
+    fig = go.Figure(data=[go.Bar(x=_TREND_MONTHS, y=returns, name=name, marker_color=color)
+                          for name, color, returns in _TREND_SERIES])
+    
+    fig.update_layout(title='Recent Market Performance', xaxis_title='Month',
+                     yaxis_title='Return (%)', legend_title_text='Category',
+                     barmode='group', template='plotly_white', height=400,
+                     plot_bgcolor='rgba(240,253,244,0.3)')
+    return fig.to_dict()
+
+RISK_LEVELS = ["Very Low", "Low", "Medium", "High", "Very High"]
+
+def render_charts(risk_tolerance, time_horizon):
+    """Projection, simulation and trend chart tabs"""
+    # Rebuild figures only when their inputs change; the builders return plain
+    # figure dicts, which st.plotly_chart renders directly
+    if st.session_state.get('last_horizon') != time_horizon:
+        st.session_state.proj_fig = create_projection_chart(time_horizon)
+        st.session_state.last_horizon = time_horizon
+    if 'trend_fig' not in st.session_state:
+        st.session_state.trend_fig = create_trend_chart()
+    
+    tab1, tab2, tab3 = st.tabs(["📈 Projections", "🎲 Simulation", "📊 Trends"])
+    with tab1:
+        st.plotly_chart(st.session_state.proj_fig, use_container_width=True)
+    with tab2:
+        st.plotly_chart(create_simulation_chart(risk_tolerance, time_horizon), use_container_width=True)
+    with tab3:
+        st.plotly_chart(st.session_state.trend_fig, use_container_width=True)
+
+def report_version(report_key):
+    """Modification times of the files behind a report key"""
+    keys = report_key.values() if isinstance(report_key, dict) else [report_key]
+    return tuple(report_path(key).stat().st_mtime_ns for key in keys)
+
+# Keyed on the file versions too, so a refreshed report is read again
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_report(report_key, version):
+    """Per-level texts (None for a single report), markdown and download bytes"""
+    if isinstance(report_key, dict):
+        reports = {level: read_report(key) for level, key in report_key.items()}
+        report_md = "\n\n---\n\n".join(f"## {level} Risk\n\n{text}" for level, text in reports.items())
+    else:
+        reports = None
+        report_md = read_report(report_key)
+    return reports, report_md, report_md.encode('utf-8')
+
+@st.fragment
+def render_report():
+    """Saved report (or scenario comparison) with its download button"""
+    st.markdown("---")
+    st.markdown('<div class="section-header">Your Report</div>', unsafe_allow_html=True)
+    if st.session_state.get('report_from_cache'):
+        st.caption("⚡ Served from cache")
+    # Reports live on disk rather than in session state; reruns reuse the
+    # cached text and bytes until the files change
+    report_key = st.session_state.report_key
+    try:
+        reports, report_md, report_bytes = load_report(report_key, report_version(report_key))
+    except FileNotFoundError:
+        st.warning("This report is no longer available. Please generate it again.")
+        return
+    if reports is not None:
+        for column, (level, text) in zip(st.columns(len(reports)), reports.items()):
+            with column:
+                st.subheader(f"{level} Risk")
+                st.markdown(text)
+    else:
+        st.markdown(report_md)
+    
+    col_dl1, col_dl2, col_dl3 = st.columns([1, 2, 1])
+    with col_dl2:
+        st.download_button(
+            label="📥 Download Report",
+            data=report_bytes,
+            file_name=st.session_state.report_filename,
+            mime="text/markdown",
+            use_container_width=True
+        )
 
 def main():
     st.markdown('<h1 class="main-title">💼 Investment Advisor</h1>', unsafe_allow_html=True)
@@ -364,6 +769,12 @@ def main():
         
         api_key = st.text_input("Primary Key", value=env_key, type="password")
         search_key = st.text_input("Research Key", value=env_search, type="password")
+        force_refresh = st.checkbox("Force refresh", value=False,
+                                    help="Ignore saved reports and run a new analysis")
+        quick_report = st.toggle("⚡ Quick report", value=False,
+                                 help="Research, projections and risk in one combined step (fewer LLM calls)")
+        compare_scenarios = st.checkbox("Compare scenarios", value=False,
+                                        help="Run Low, Medium and High risk reports side by side")
         st.markdown("---")
         st.caption("🔒 Secure & Private")
     
@@ -372,53 +783,52 @@ def main():
     with col1:
         st.markdown('<div class="section-header">Investment Parameters</div>', unsafe_allow_html=True)
         
-        amount = st.number_input("💵 Amount", min_value=1000, max_value=10000000, value=100000, step=1000)
-        currency = st.selectbox("Currency", ["USD", "EUR", "GBP", "PKR", "INR", "AED"])
-        
-        col_a, col_b = st.columns(2)
-        with col_a:
-            geography = st.multiselect("🌍 Geography", 
-                                      ["Local/Domestic", "Regional", "International", "Emerging Markets"],
-                                      default=["Local/Domestic"])
-        with col_b:
-            preferences = st.multiselect("📊 Types",
-                                        ["Stock Market", "Real Estate", "Bonds", "Mutual Funds", 
-                                         "ETFs", "Cryptocurrency", "Commodities"],
-                                        default=["Stock Market", "ETFs"])
-        
+        # Risk and timeline drive the charts too, so they sit outside the form
+        # and update them immediately; the report uses them on submit. A drag
+        # reruns the page, but the charts are cached and no crew run starts
         col_c, col_d = st.columns(2)
         with col_c:
-            risk_tolerance = st.select_slider("⚖️ Risk",
-                                             options=["Very Low", "Low", "Medium", "High", "Very High"],
-                                             value="Medium")
+            risk_tolerance = st.select_slider("⚖️ Risk", options=RISK_LEVELS, value="Medium")
         with col_d:
-            time_horizon = st.slider("📅 Timeline (Years)", min_value=1, max_value=30, value=10)
+            time_horizon = st.slider("📅 Timeline (Years)", min_value=1, max_value=MAX_HORIZON, value=10)
+        
+        # Inputs only rerun the script when the form is submitted
+        with st.form("investment_inputs"):
+            amount = st.number_input("💵 Amount", min_value=1000, max_value=10000000, value=100000, step=1000)
+            currency = st.selectbox("Currency", ["USD", "EUR", "GBP", "PKR", "INR", "AED"])
+            
+            col_a, col_b = st.columns(2)
+            with col_a:
+                geography = st.multiselect("🌍 Geography", 
+                                          ["Local/Domestic", "Regional", "International", "Emerging Markets"],
+                                          default=["Local/Domestic"])
+            with col_b:
+                preferences = st.multiselect("📊 Types",
+                                            ["Stock Market", "Real Estate", "Bonds", "Mutual Funds", 
+                                             "ETFs", "Cryptocurrency", "Commodities"],
+                                            default=["Stock Market", "ETFs"])
+            
+            submitted = st.form_submit_button("🚀 Generate Report", type="primary", use_container_width=True)
     
     with col2:
         st.markdown('<div class="section-header">Insights</div>', unsafe_allow_html=True)
-        st.markdown('<div class="metric-box"><h4>Diversity</h4><div class="value">4-6</div></div>', unsafe_allow_html=True)
-        st.markdown('<div class="metric-box"><h4>Target</h4><div class="value">7-12%</div></div>', unsafe_allow_html=True)
-        st.markdown('<div class="metric-box"><h4>Mix</h4><div class="value">60/30/10</div></div>', unsafe_allow_html=True)
-        st.markdown('<div class="warning-card"><p><strong>⚠️ Notice:</strong> Informational only. Consult professionals.</p></div>', unsafe_allow_html=True)
+        st.markdown(INSIGHT_METRICS_HTML, unsafe_allow_html=True)
+        st.warning("**Notice:** Informational only. Consult professionals.", icon="⚠️")
     
     st.markdown("---")
     st.markdown('<div class="section-header">Analysis</div>', unsafe_allow_html=True)
     
-    tab1, tab2 = st.tabs(["📈 Projections", "📊 Trends"])
-    with tab1:
-        st.plotly_chart(create_projection_chart(time_horizon), use_container_width=True)
-    with tab2:
-        st.plotly_chart(create_trend_chart(), use_container_width=True)
-    
-    st.markdown("---")
-    st.markdown('<div class="section-header">Generate Report</div>', unsafe_allow_html=True)
+    render_charts(risk_tolerance, time_horizon)
     
     if 'done' not in st.session_state:
         st.session_state.done = False
-    if 'report' not in st.session_state:
-        st.session_state.report = None
+    if 'report_key' not in st.session_state:
+        st.session_state.report_key = None
+    
+    if st.session_state.pop('analysis_cancelled', False):
+        st.info("Analysis cancelled.")
     
-    if st.button("🚀 Generate Report", type="primary", use_container_width=True):
+    if submitted:
         if not api_key or not search_key:
             st.error("⚠️ Provide credentials in sidebar.")
         elif not preferences or not geography:
@@ -433,32 +843,25 @@ def main():
                 'time_horizon': time_horizon
             }
             
-            with st.spinner("📊 Analyzing... (2-3 minutes)"):
-                result = run_analysis(data, api_key, search_key)
+            with st.status("📊 Analyzing... (2-3 minutes, repeated searches are served from cache)", expanded=True) as status:
+                result = run_analysis(data, api_key, search_key, container=status,
+                                      force_refresh=force_refresh, quick=quick_report,
+                                      compare=compare_scenarios)
                 
                 if result:
-                    st.session_state.report = result
+                    st.session_state.report_key = result
+                    st.session_state.report_filename = f"report_{datetime.now():%Y%m%d_%H%M%S}.md"
                     st.session_state.done = True
-                    st.success("✅ Complete!")
+                    label = "⚡ Served from cache" if st.session_state.report_from_cache else "✅ Complete!"
+                    status.update(label=label, state="complete", expanded=False)
                     st.balloons()
+                else:
+                    status.update(label="Analysis did not complete", state="error")
     
-    if st.session_state.done and st.session_state.report:
-        st.markdown("---")
-        st.markdown('<div class="section-header">Your Report</div>', unsafe_allow_html=True)
-        st.markdown(str(st.session_state.report))
-        
-        col_dl1, col_dl2, col_dl3 = st.columns([1, 2, 1])
-        with col_dl2:
-            st.download_button(
-                label="📥 Download Report",
-                data=str(st.session_state.report).encode('utf-8'),
-                file_name=f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                mime="text/markdown",
-                use_container_width=True
-            )
+    if st.session_state.done and st.session_state.report_key:
+        render_report()
     
-    st.markdown("---")
-    st.markdown('<div style="text-align:center;color:#6b7280;padding:2rem;"><p>Intelligent Analysis • Secure • Informational Only</p></div>', unsafe_allow_html=True)
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
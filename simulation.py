@@ -0,0 +1,49 @@
+"""
+Monte Carlo growth simulation for the Investment Advisor App
+
+With numba installed, run `python -c "import simulation; simulation.warm_up()"`
+during the container build so the compiled kernel is cached before the first
+user request.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+def _simulate_paths_numpy(mu, sigma, shocks):
+    """Geometric Brownian motion growth multiples from standard normal shocks"""
+    return np.exp(np.cumsum(mu - 0.5 * sigma ** 2 + sigma * shocks, axis=1))
+
+def _simulate_paths_kernel(mu, sigma, shocks):
+    """Loop form of the GBM simulation, compiled by numba when available"""
+    n_sims, years = shocks.shape
+    paths = np.empty((n_sims, years))
+    drift = mu - 0.5 * sigma * sigma
+    for i in prange(n_sims):
+        value = 1.0
+        for y in range(years):
+            value *= np.exp(drift + sigma * shocks[i, y])
+            paths[i, y] = value
+    return paths
+
+if njit is not None:
+    # cache=True writes the compiled kernel to __pycache__ so process restarts
+    # skip the JIT compile
+    _simulate_paths = njit(parallel=True, cache=True, fastmath=True)(_simulate_paths_kernel)
+else:
+    _simulate_paths = _simulate_paths_numpy
+
+def simulate_paths(mu, sigma, years, n_sims=10_000, seed=42):
+    """Simulated growth multiples for n_sims paths over the given years"""
+    # The shocks are drawn here rather than inside the parallel kernel, where
+    # numba's per-thread generators would make the result depend on thread
+    # scheduling; the same seed gives the same paths with or without numba
+    shocks = np.random.default_rng(seed).standard_normal((n_sims, years))
+    return _simulate_paths(mu, sigma, shocks)
+
+def warm_up():
+    """Trigger (or load from cache) the kernel compile ahead of the first real run"""
+    simulate_paths(0.05, 0.1, 1, n_sims=1, seed=0)
@@ -3,6 +3,7 @@
 Test script to verify the installation and API keys
 """
 
+import importlib.util
 import os
 import sys
 
@@ -29,10 +30,10 @@ def check_dependencies():
     
     missing_packages = []
     for package in required_packages:
-        try:
-            __import__(package)
+        # find_spec locates the package without running its import-time code
+        if importlib.util.find_spec(package) is not None:
             print(f"✓ {package} installed")
-        except ImportError:
+        else:
             print(f"❌ {package} not installed")
             missing_packages.append(package)
     
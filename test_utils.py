@@ -0,0 +1,162 @@
+"""
+Tests for the helper utilities
+"""
+
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import (
+    _CURRENCY_SYMBOLS,
+    _RETURN_RANGES,
+    _RISK_TOOLTIPS,
+    _compiled_growth_kernel,
+    _fill_growth_table_numpy,
+    calculate_compound_growth,
+    calculate_compound_growth_table,
+    calculate_diversification_score,
+    format_currency,
+    format_currency_array,
+    generate_monthly_performance,
+    generate_roi_scenarios,
+    generate_sector_allocation,
+    get_expected_return_range,
+    get_risk_tooltip,
+    validate_investment_inputs,
+)
+
+CATEGORIES = ['Stocks', 'Bonds', 'Real Estate', 'Commodities']
+
+def test_monthly_performance_columns():
+    """Month and Category are categoricals, returns are floats"""
+    df = generate_monthly_performance(months=6)
+    
+    assert list(df.columns) == ['Month', 'Category', 'Return (%)']
+    assert len(df) == 6 * len(CATEGORIES)
+    assert isinstance(df['Month'].dtype, pd.CategoricalDtype)
+    assert isinstance(df['Category'].dtype, pd.CategoricalDtype)
+    assert df['Return (%)'].dtype == 'float64'
+    assert df['Return (%)'].notna().all()
+
+def test_monthly_performance_categories():
+    """Every month lists the four categories in order; months stay chronological"""
+    df = generate_monthly_performance(months=6)
+    
+    assert list(df['Category'].cat.categories) == CATEGORIES
+    assert df['Category'].tolist() == CATEGORIES * 6
+    
+    month_categories = list(df['Month'].cat.categories)
+    assert month_categories == list(dict.fromkeys(df['Month']))
+    months = pd.to_datetime(pd.Series(month_categories), format='%b %Y')
+    assert months.is_monotonic_increasing
+    assert df['Month'].notna().all()
+
+def test_growth_kernel_matches_numpy():
+    """The numba kernel fills the same table as the NumPy broadcast, also into a strided view"""
+    pytest.importorskip("numba")
+    kernel = _compiled_growth_kernel()
+    rates = np.array([0.05, 0.085, 0.135])
+    expected = _fill_growth_table_numpy(100_000.0, rates, 30, np.empty((3, 30)))
+    
+    contiguous = kernel(100_000.0, rates, 30, np.empty((3, 30)))
+    np.testing.assert_allclose(contiguous, expected, rtol=1e-12)
+    
+    strided = np.empty((3, 60))[:, ::2]
+    result = kernel(100_000.0, rates, 30, strided)
+    assert not strided.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(strided, expected, rtol=1e-12)
+    np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+def test_growth_table_shape_and_values():
+    """Row i holds principal grown at rates[i] for years 1..n"""
+    table = calculate_compound_growth_table(1000, [0.0, 0.1], 3)
+    
+    assert table.shape == (2, 3)
+    np.testing.assert_allclose(table, [[1000, 1000, 1000], [1100, 1210, 1331]])
+
+@pytest.mark.parametrize('currency', ['USD', 'PKR', 'AED', 'XYZ'])
+def test_format_currency_array_matches_scalar(currency):
+    """The array formatter agrees with format_currency, including at the magnitude boundaries"""
+    amounts = [-2_500_000, -1500, -0.5, 0, 999.999, 1000, 999_999.999, 1e6, 12_345_678]
+    
+    assert format_currency_array(amounts, currency).tolist() == [
+        format_currency(amount, currency) for amount in amounts
+    ]
+
+def test_roi_scenarios_cached_and_read_only():
+    """Repeat calls share one read-only result whose values match the scalar formula"""
+    scenarios = generate_roi_scenarios(50_000, years=5)
+    
+    assert generate_roi_scenarios(50_000, years=5) is scenarios
+    assert isinstance(scenarios, types.MappingProxyType)
+    assert scenarios['years'] == (1, 2, 3, 4, 5)
+    for key, rate in (('conservative', 0.05), ('moderate', 0.085), ('aggressive', 0.135)):
+        assert isinstance(scenarios[key], tuple)
+        assert scenarios[key] == pytest.approx([calculate_compound_growth(50_000, rate, y) for y in range(1, 6)])
+    with pytest.raises(TypeError):
+        scenarios['moderate'] = ()
+
+def test_sector_allocation_read_only():
+    """Each allocation covers every sector and sums to 100"""
+    allocation = generate_sector_allocation()
+    
+    for key in ('conservative', 'moderate', 'aggressive'):
+        assert len(allocation[key]) == len(allocation['sectors'])
+        assert sum(allocation[key]) == 100
+    with pytest.raises(TypeError):
+        allocation['moderate'] = ()
+
+@pytest.mark.parametrize('amount, currency, expected', [
+    (500, 'USD', '$500.00'),
+    (1000, 'INR', '₹1.00K'),
+    (1500, 'EUR', '€1.50K'),
+    (999_999, 'USD', '$1000.00K'),
+    (250_000, 'AED', 'AED 250.00K'),
+    (1_000_000, 'PKR', 'Rs.1.00M'),
+    (2_500_000, 'GBP', '£2.50M'),
+    (5000, 'XYZ', 'XYZ 5.00K'),
+])
+def test_format_currency(amount, currency, expected):
+    """Amounts are scaled to K/M at the thresholds; unknown codes are used as the prefix"""
+    assert format_currency(amount, currency) == expected
+
+def test_validate_investment_inputs():
+    """Errors come back as a tuple in rule order; valid inputs give an empty tuple"""
+    assert validate_investment_inputs(5000, ['ETFs'], ['Regional']) == ()
+    assert validate_investment_inputs(500, [], []) == (
+        "Investment amount should be at least 1,000",
+        "Please select at least one investment preference",
+        "Please select at least one geographic preference",
+    )
+    assert validate_investment_inputs(20_000_000, ['ETFs'], ['Regional']) == (
+        "Investment amount exceeds maximum limit of 10,000,000",
+    )
+
+@pytest.mark.parametrize('count, expected', [
+    (0, ("Low", "❌")),
+    (1, ("Low", "❌")),
+    (2, ("Moderate", "⚠️")),
+    (3, ("Good", "✅")),
+    (4, ("Good", "✅")),
+    (5, ("Excellent", "🌟")),
+    (6, ("Excellent", "🌟")),
+    (7, ("Excellent", "🌟")),
+])
+def test_diversification_score(count, expected):
+    """Each threshold starts the next band, matching the original >= chain"""
+    assert calculate_diversification_score(['type'] * count) == expected
+
+def test_lookup_defaults():
+    """Known levels map through the tables; unknown ones fall back"""
+    assert get_expected_return_range('High') == "10-15% annually"
+    assert get_expected_return_range('Unknown') == "7-10% annually"
+    assert get_risk_tooltip('Low').startswith("Conservative approach.")
+    assert get_risk_tooltip('Unknown') == ""
+
+@pytest.mark.parametrize('table', [_CURRENCY_SYMBOLS, _RISK_TOOLTIPS, _RETURN_RANGES])
+def test_lookup_tables_read_only(table):
+    """The module-level tables cannot be changed by callers"""
+    with pytest.raises(TypeError):
+        table['New'] = ''
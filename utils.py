@@ -1,273 +1,336 @@
 """
 Helper utilities for the Investment Advisor App
+
+plotly, pandas and the optional numba are imported inside the functions that
+need them, so importing this module for its formatting and scoring helpers
+stays cheap.
 """
 
-import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import bisect
+import functools
+import math
+import types
 import numpy as np
 
 def calculate_compound_growth(principal, rate, years):
     """Calculate compound growth over years"""
-    return principal * (1 + rate) ** years
+    return principal * math.pow(1.0 + rate, years)
+
+def calculate_compound_growth_vec(principal, rate, years_arr):
+    """Compound growth for an array of years (rate may be an array that broadcasts)"""
+    return principal * np.power(1.0 + rate, years_arr)
+
+def _fill_growth_table_numpy(principal, rates, years_max, out):
+    """Write principal grown at rates[i] for 1..years_max years into out[i]"""
+    out[:] = calculate_compound_growth_vec(principal, rates[:, None], np.arange(1, years_max + 1))
+    return out
+
+def _fill_growth_table_kernel(principal, rates, years_max, out):
+    """Loop form of the growth table, compiled by numba when available"""
+    for i in range(rates.shape[0]):
+        base = 1.0 + rates[i]
+        acc = principal
+        for y in range(years_max):
+            acc *= base
+            out[i, y] = acc
+    return out
 
+# Below this many cells the NumPy broadcast is faster than importing numba
+# and compiling the kernel
+_JIT_MIN_CELLS = 100_000
+
+@functools.lru_cache(maxsize=1)
+def _compiled_growth_kernel():
+    """numba build of the growth kernel, or None when numba is not installed"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    # cache=True keeps the compiled kernel in __pycache__ across restarts
+    return njit(cache=True, fastmath=True)(_fill_growth_table_kernel)
+
+def calculate_compound_growth_table(principal, rates, years):
+    """Compound growth at each rate for years 1..years, shape (len(rates), years)"""
+    rates = np.asarray(rates, dtype=np.float64)
+    out = np.empty((rates.shape[0], years))
+    kernel = _compiled_growth_kernel() if out.size >= _JIT_MIN_CELLS else None
+    fill = kernel if kernel is not None else _fill_growth_table_numpy
+    return fill(float(principal), rates, years, out)
+
+@functools.lru_cache(maxsize=64)
 def generate_roi_scenarios(amount, years=10):
-    """Generate best, average, and worst case ROI scenarios"""
-    scenarios = {
-        'years': list(range(1, years + 1)),
-        'conservative': [],
-        'moderate': [],
-        'aggressive': []
-    }
+    """Generate best, average, and worst case ROI scenarios (cached, read-only)"""
+    years_arr = np.arange(1, years + 1)
     
-    # Conservative: 4-6% annual return
-    conservative_rate = 0.05
-    # Moderate: 7-10% annual return
-    moderate_rate = 0.085
-    # Aggressive: 12-15% annual return
-    aggressive_rate = 0.135
+    # Conservative: 4-6%, moderate: 7-10%, aggressive: 12-15% annual return
+    rates = np.array([0.05, 0.085, 0.135])
     
-    for year in scenarios['years']:
-        scenarios['conservative'].append(
-            calculate_compound_growth(amount, conservative_rate, year)
-        )
-        scenarios['moderate'].append(
-            calculate_compound_growth(amount, moderate_rate, year)
-        )
-        scenarios['aggressive'].append(
-            calculate_compound_growth(amount, aggressive_rate, year)
-        )
+    # Every scenario's value for every year in one call, shape (3, years)
+    growth = calculate_compound_growth_table(amount, rates, years)
     
-    return scenarios
+    # The cached result is shared between callers, so hand out a read-only view
+    return types.MappingProxyType({
+        'years': tuple(years_arr.tolist()),
+        'conservative': tuple(growth[0].tolist()),
+        'moderate': tuple(growth[1].tolist()),
+        'aggressive': tuple(growth[2].tolist())
+    })
 
-def create_detailed_roi_chart(amount, years, currency):
-    """Create detailed ROI projection chart"""
+# (legend name, line colour, scenario key) for each ROI chart trace
+_ROI_TRACES = (
+    ('Conservative (5% avg)', '#2ecc71', 'conservative'),
+    ('Moderate (8.5% avg)', '#3498db', 'moderate'),
+    ('Aggressive (13.5% avg)', '#e74c3c', 'aggressive'),
+)
+_ROI_HOVER_TMPL = 'Year %{{x}}<br>{currency} %{{y:,.0f}}<extra></extra>'
+# Shared layout settings; each chart merges its titles into a copy
+_ROI_LAYOUT_BASE = {
+    'hovermode': 'x unified',
+    'template': 'plotly_white',
+    'height': 500,
+    'showlegend': True,
+    'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'right', 'x': 1}
+}
+
+@functools.lru_cache(maxsize=32)
+def _detailed_roi_chart_dict(amount, years, currency):
+    """Figure dict for the ROI projection chart"""
+    # Built as a plain spec: plotly validates it once, when the caller wraps
+    # it in a Figure, instead of again for every trace and layout update here
     scenarios = generate_roi_scenarios(amount, years)
+    amt_str = f"{amount:,.0f}"
+    # One shared x array for all traces
+    x_years = np.asarray(scenarios['years'], dtype=np.int16)
     
-    fig = go.Figure()
-    
-    # Conservative scenario
-    fig.add_trace(go.Scatter(
-        x=scenarios['years'],
-        y=scenarios['conservative'],
-        mode='lines+markers',
-        name='Conservative (5% avg)',
-        line=dict(color='#2ecc71', width=3),
-        hovertemplate=f'Year %{{x}}<br>{currency} %{{y:,.0f}}<extra></extra>'
-    ))
+    hover_template = _ROI_HOVER_TMPL.format(currency=currency)
+    traces = [
+        {
+            'type': 'scatter',
+            'x': x_years,
+            'y': np.asarray(scenarios[key], dtype=np.float64),
+            'mode': 'lines+markers',
+            'name': name,
+            'line': {'color': color, 'width': 3},
+            'hovertemplate': hover_template
+        }
+        for name, color, key in _ROI_TRACES
+    ]
     
-    # Moderate scenario
-    fig.add_trace(go.Scatter(
-        x=scenarios['years'],
-        y=scenarios['moderate'],
-        mode='lines+markers',
-        name='Moderate (8.5% avg)',
-        line=dict(color='#3498db', width=3),
-        hovertemplate=f'Year %{{x}}<br>{currency} %{{y:,.0f}}<extra></extra>'
-    ))
-    
-    # Aggressive scenario
-    fig.add_trace(go.Scatter(
-        x=scenarios['years'],
-        y=scenarios['aggressive'],
-        mode='lines+markers',
-        name='Aggressive (13.5% avg)',
-        line=dict(color='#e74c3c', width=3),
-        hovertemplate=f'Year %{{x}}<br>{currency} %{{y:,.0f}}<extra></extra>'
-    ))
+    # Initial investment line, labelled at its right end (what add_hline draws)
+    initial_line = {
+        'type': 'line', 'xref': 'x domain', 'x0': 0, 'x1': 1, 'yref': 'y', 'y0': amount, 'y1': amount,
+        'line': {'dash': 'dash', 'color': 'gray'}
+    }
+    initial_label = {
+        'text': f"Initial: {currency} {amt_str}", 'showarrow': False,
+        'xref': 'x domain', 'x': 1, 'xanchor': 'left', 'yref': 'y', 'y': amount, 'yanchor': 'middle'
+    }
     
-    # Add initial investment line
-    fig.add_hline(
-        y=amount,
-        line_dash="dash",
-        line_color="gray",
-        annotation_text=f"Initial: {currency} {amount:,.0f}",
-        annotation_position="right"
-    )
+    layout = {
+        **_ROI_LAYOUT_BASE,
+        'title': f'Investment Growth Projection ({years} Years)',
+        'xaxis': {'title': {'text': 'Years'}},
+        'yaxis': {'title': {'text': f'Portfolio Value ({currency})'}},
+        'shapes': [initial_line],
+        'annotations': [initial_label]
+    }
     
-    fig.update_layout(
-        title=f'Investment Growth Projection ({years} Years)',
-        xaxis_title='Years',
-        yaxis_title=f'Portfolio Value ({currency})',
-        hovermode='x unified',
-        template='plotly_white',
-        height=500,
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
-    )
+    return {'data': traces, 'layout': layout}
+
+def create_detailed_roi_chart(amount, years, currency):
+    """Create detailed ROI projection chart"""
+    import plotly.graph_objects as go
     
-    return fig
+    # Building the traces and layout is the expensive part, so the figure
+    # dict is cached and each caller gets a fresh Figure around it
+    return go.Figure(_detailed_roi_chart_dict(amount, years, currency))
+
+_SECTORS = ('Technology', 'Healthcare', 'Finance', 'Real Estate', 'Consumer', 'Energy', 'Other')
+# Tuples keep the shared weights immutable while still doing plain integer
+# arithmetic for callers
+_CONSERVATIVE_ALLOC = (15, 20, 25, 15, 15, 5, 5)
+_MODERATE_ALLOC = (25, 15, 20, 15, 15, 5, 5)
+_AGGRESSIVE_ALLOC = (35, 15, 15, 10, 15, 5, 5)
+
+_PIE_COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2')
+_PIE_LAYOUT_BASE = {'showlegend': True, 'height': 400}
+
+# Unknown risk levels fall back to the moderate mix
+_ALLOC_BY_RISK = {
+    'Very Low': (_CONSERVATIVE_ALLOC, 'Conservative Portfolio Allocation'),
+    'Low': (_CONSERVATIVE_ALLOC, 'Conservative Portfolio Allocation'),
+    'Medium': (_MODERATE_ALLOC, 'Moderate Portfolio Allocation'),
+    'High': (_AGGRESSIVE_ALLOC, 'Aggressive Portfolio Allocation'),
+    'Very High': (_AGGRESSIVE_ALLOC, 'Aggressive Portfolio Allocation'),
+}
 
 def generate_sector_allocation():
-    """Generate recommended sector allocation"""
-    sectors = ['Technology', 'Healthcare', 'Finance', 'Real Estate', 'Consumer', 'Energy', 'Other']
-    conservative = [15, 20, 25, 15, 15, 5, 5]
-    moderate = [25, 15, 20, 15, 15, 5, 5]
-    aggressive = [35, 15, 15, 10, 15, 5, 5]
+    """Generate recommended sector allocation (read-only)"""
+    return types.MappingProxyType({
+        'sectors': _SECTORS,
+        'conservative': _CONSERVATIVE_ALLOC,
+        'moderate': _MODERATE_ALLOC,
+        'aggressive': _AGGRESSIVE_ALLOC
+    })
+
+@functools.lru_cache(maxsize=8)
+def _allocation_chart_dict(risk_tolerance):
+    """Figure dict for the sector allocation pie chart"""
+    values, title = _ALLOC_BY_RISK.get(risk_tolerance, _ALLOC_BY_RISK['Medium'])
     
-    return {
-        'sectors': sectors,
-        'conservative': conservative,
-        'moderate': moderate,
-        'aggressive': aggressive
+    pie = {
+        'type': 'pie',
+        'labels': _SECTORS,
+        'values': values,
+        'hole': 0.3,
+        'marker': {'colors': _PIE_COLORS}
     }
+    
+    return {'data': [pie], 'layout': {**_PIE_LAYOUT_BASE, 'title': title}}
 
 def create_allocation_chart(risk_tolerance):
     """Create sector allocation pie chart"""
-    allocation = generate_sector_allocation()
-    
-    if risk_tolerance in ['Very Low', 'Low']:
-        values = allocation['conservative']
-        title = 'Conservative Portfolio Allocation'
-    elif risk_tolerance in ['High', 'Very High']:
-        values = allocation['aggressive']
-        title = 'Aggressive Portfolio Allocation'
-    else:
-        values = allocation['moderate']
-        title = 'Moderate Portfolio Allocation'
-    
-    fig = go.Figure(data=[go.Pie(
-        labels=allocation['sectors'],
-        values=values,
-        hole=0.3,
-        marker=dict(colors=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2'])
-    )])
-    
-    fig.update_layout(
-        title=title,
-        showlegend=True,
-        height=400
-    )
+    import plotly.graph_objects as go
     
-    return fig
+    return go.Figure(_allocation_chart_dict(risk_tolerance))
 
 def generate_monthly_performance(months=6):
     """Generate realistic monthly performance data"""
+    import pandas as pd
+    
     categories = ['Stocks', 'Bonds', 'Real Estate', 'Commodities']
     
-    data = []
-    for i in range(months):
-        month = (datetime.now() - timedelta(days=30*(months-i))).strftime('%b %Y')
-        for category in categories:
-            # Generate realistic returns with some volatility
-            if category == 'Stocks':
-                base_return = np.random.normal(1.2, 2.5)
-            elif category == 'Bonds':
-                base_return = np.random.normal(0.5, 0.8)
-            elif category == 'Real Estate':
-                base_return = np.random.normal(0.8, 1.2)
-            else:  # Commodities
-                base_return = np.random.normal(0.3, 3.0)
-            
-            data.append({
-                'Month': month,
-                'Category': category,
-                'Return (%)': round(base_return, 2)
-            })
+    # Mean and volatility of each category's monthly return, in category order
+    loc = np.array([1.2, 0.5, 0.8, 0.3])
+    scale = np.array([2.5, 0.8, 1.2, 3.0])
+    returns = np.random.default_rng().normal(loc, scale, size=(months, len(categories))).round(2)
     
-    return pd.DataFrame(data)
+    # One clock read; the labels come from vectorized DatetimeIndex arithmetic
+    offsets = pd.to_timedelta(30 * np.arange(months, 0, -1), unit='D')
+    month_labels = pd.Index((pd.Timestamp.now() - offsets).strftime('%b %Y'))
+    
+    # Build the frame column-wise from categorical codes so pandas never
+    # materializes or re-hashes the repeated label strings; factorize keeps
+    # months in chronological order and merges labels that share a month.
+    # It needs an Index or array: plain lists are deprecated in pandas 2 and
+    # rejected in pandas 3
+    month_codes, month_categories = pd.factorize(month_labels)
+    category_codes = np.arange(len(categories), dtype=np.int8)
+    return pd.DataFrame({
+        'Month': pd.Categorical.from_codes(np.repeat(month_codes, len(categories)),
+                                           categories=month_categories),
+        'Category': pd.Categorical.from_codes(np.tile(category_codes, months), categories=categories),
+        'Return (%)': returns.ravel()
+    })
+
+_CURRENCY_SYMBOLS = types.MappingProxyType({
+    'USD': '$',
+    'EUR': '€',
+    'GBP': '£',
+    'PKR': 'Rs.',
+    'INR': '₹',
+    'AED': 'AED '
+})
+
+# (divisor, suffix) for millions, thousands and plain amounts
+_MAG = ((1_000_000, 'M'), (1_000, 'K'), (1, ''))
 
 def format_currency(amount, currency):
     """Format currency with appropriate symbols"""
-    symbols = {
-        'USD': '$',
-        'EUR': '€',
-        'GBP': '£',
-        'PKR': 'Rs.',
-        'INR': '₹',
-        'AED': 'AED '
-    }
-    
-    symbol = symbols.get(currency, currency + ' ')
-    
-    if amount >= 1_000_000:
-        return f"{symbol}{amount/1_000_000:.2f}M"
-    elif amount >= 1_000:
-        return f"{symbol}{amount/1_000:.2f}K"
-    else:
-        return f"{symbol}{amount:.2f}"
+    symbol = _CURRENCY_SYMBOLS.get(currency, currency + ' ')
+    div, suffix = _MAG[0 if amount >= 1_000_000 else 1 if amount >= 1_000 else 2]
+    return f"{symbol}{amount/div:.2f}{suffix}"
+
+def format_currency_array(amounts, currency):
+    """Format many amounts at once, e.g. a DataFrame column; same output as format_currency"""
+    a = np.asarray(amounts, dtype=np.float64)
+    millions = a >= 1e6
+    thousands = (a >= 1e3) & ~millions
+    scaled = np.where(millions, a / 1e6, np.where(thousands, a / 1e3, a))
+    suffix = np.where(millions, 'M', np.where(thousands, 'K', ''))
+    symbol = _CURRENCY_SYMBOLS.get(currency, currency + ' ')
+    return np.char.add(np.char.add(symbol, np.char.mod('%.2f', scaled)), suffix)
+
+# Ascending preference-count thresholds and the score for each band below,
+# between and above them (out of 7 investment types)
+_DIVERSIFICATION_THRESHOLDS = (2, 3, 5)
+_DIVERSIFICATION_SCORES = (("Low", "❌"), ("Moderate", "⚠️"), ("Good", "✅"), ("Excellent", "🌟"))
 
 def calculate_diversification_score(preferences):
     """Calculate diversification score based on selected preferences"""
-    max_score = 7  # Total number of investment types
-    current = len(preferences)
-    
-    if current >= 5:
-        return "Excellent", "🌟"
-    elif current >= 3:
-        return "Good", "✅"
-    elif current >= 2:
-        return "Moderate", "⚠️"
-    else:
-        return "Low", "❌"
+    return _DIVERSIFICATION_SCORES[bisect.bisect_right(_DIVERSIFICATION_THRESHOLDS, len(preferences))]
+
+_RISK_TOOLTIPS = types.MappingProxyType({
+    'Very Low': "Suitable for capital preservation. Expects 3-5% annual returns with minimal volatility.",
+    'Low': "Conservative approach. Expects 4-7% annual returns with low volatility.",
+    'Medium': "Balanced risk-reward. Expects 7-10% annual returns with moderate volatility.",
+    'High': "Growth-focused. Expects 10-15% annual returns with higher volatility.",
+    'Very High': "Aggressive strategy. Expects 15%+ annual returns with significant volatility."
+})
 
 def get_risk_tooltip(risk_level):
     """Get detailed tooltip for risk levels"""
-    tooltips = {
-        'Very Low': "Suitable for capital preservation. Expects 3-5% annual returns with minimal volatility.",
-        'Low': "Conservative approach. Expects 4-7% annual returns with low volatility.",
-        'Medium': "Balanced risk-reward. Expects 7-10% annual returns with moderate volatility.",
-        'High': "Growth-focused. Expects 10-15% annual returns with higher volatility.",
-        'Very High': "Aggressive strategy. Expects 15%+ annual returns with significant volatility."
-    }
-    return tooltips.get(risk_level, "")
+    return _RISK_TOOLTIPS.get(risk_level, "")
 
-def generate_investment_summary(investment_data):
-    """Generate a summary of investment parameters"""
-    summary = f"""
+_SUMMARY_TEMPLATE = """
     ### 📊 Investment Summary
     
-    **Investment Amount**: {format_currency(investment_data['amount'], investment_data['currency'])}
+    **Investment Amount**: {amount}
     
-    **Investment Preferences**: {investment_data['preferences']}
+    **Investment Preferences**: {preferences}
     
-    **Geographic Focus**: {investment_data['geography']}
+    **Geographic Focus**: {geography}
     
-    **Risk Profile**: {investment_data['risk_tolerance']}
+    **Risk Profile**: {risk}
     
-    **Time Horizon**: {investment_data['time_horizon']} years
+    **Time Horizon**: {horizon} years
     
-    **Expected Return Range**: {get_expected_return_range(investment_data['risk_tolerance'])}
+    **Expected Return Range**: {returns}
     """
-    return summary
+
+def generate_investment_summary(investment_data):
+    """Generate a summary of investment parameters"""
+    amount, currency, preferences, geography, risk, horizon = (
+        investment_data[k]
+        for k in ('amount', 'currency', 'preferences', 'geography', 'risk_tolerance', 'time_horizon')
+    )
+    return _SUMMARY_TEMPLATE.format(
+        amount=format_currency(amount, currency),
+        preferences=preferences,
+        geography=geography,
+        risk=risk,
+        horizon=horizon,
+        returns=get_expected_return_range(risk)
+    )
+
+_RETURN_RANGES = types.MappingProxyType({
+    'Very Low': "3-5% annually",
+    'Low': "4-7% annually",
+    'Medium': "7-10% annually",
+    'High': "10-15% annually",
+    'Very High': "15%+ annually"
+})
 
 def get_expected_return_range(risk_tolerance):
     """Get expected return range based on risk tolerance"""
-    ranges = {
-        'Very Low': "3-5% annually",
-        'Low': "4-7% annually",
-        'Medium': "7-10% annually",
-        'High': "10-15% annually",
-        'Very High': "15%+ annually"
-    }
-    return ranges.get(risk_tolerance, "7-10% annually")
+    return _RETURN_RANGES.get(risk_tolerance, "7-10% annually")
+
+# (predicate on amount, preferences, geography; error message) for each input rule
+_RULES = (
+    (lambda a, p, g: a < 1000, "Investment amount should be at least 1,000"),
+    (lambda a, p, g: a > 10_000_000, "Investment amount exceeds maximum limit of 10,000,000"),
+    (lambda a, p, g: not p, "Please select at least one investment preference"),
+    (lambda a, p, g: not g, "Please select at least one geographic preference"),
+)
 
 def validate_investment_inputs(amount, preferences, geography):
-    """Validate user inputs"""
-    errors = []
-    
-    if amount < 1000:
-        errors.append("Investment amount should be at least 1,000")
-    
-    if amount > 10_000_000:
-        errors.append("Investment amount exceeds maximum limit of 10,000,000")
-    
-    if not preferences:
-        errors.append("Please select at least one investment preference")
-    
-    if not geography:
-        errors.append("Please select at least one geographic preference")
-    
-    return errors
+    """Validate user inputs; returns a tuple of error messages, empty when valid"""
+    return tuple(msg for pred, msg in _RULES if pred(amount, preferences, geography))
 
 def create_comparison_table(recommendations):
     """Create a comparison table for investment recommendations"""
+    import pandas as pd
+    
     # This would process the AI recommendations into a structured table
     # For now, return a sample structure
     data = {